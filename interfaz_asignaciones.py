@@ -2,12 +2,34 @@
 Interfaz para gestión de asignaciones
 """
 
+import sys
+
 from modulo_asignaciones import GestorAsignaciones, Asignacion
 from modulo_implementos import AdministradorImplementos
 from modulo_miembros import ControladorMiembros
 from nucleo_sistema import Utilidades, RegistroActividad
 
 
+# Plantilla de fila precompilada para listar_todas; la última columna
+# llega ya formateada desde Asignacion.columnas_estado()
+_FILA = "{:<12}{:<28}{:<28}{}".format
+
+# Menú prerenderado una sola vez al importar el módulo
+_MENU = "\n".join([
+    "\n" + "╔" + "═" * 50 + "╗",
+    "║" + " " * 14 + "GESTIÓN DE ASIGNACIONES" + " " * 13 + "║",
+    "╚" + "═" * 50 + "╝",
+    "  [1] Ver todas las asignaciones",
+    "  [2] Crear nueva asignación",
+    "  [3] Procesar devolución",
+    "  [4] Cancelar asignación",
+    "  [5] Extender fecha de retorno",
+    "  [6] Guardar cambios",
+    "  [7] Retornar",
+    "─" * 52
+]) + "\n"
+
+
 class PantallasAsignaciones:
     """Interfaz para gestión de asignaciones"""
     
@@ -17,38 +39,30 @@ class PantallasAsignaciones:
         self.ctrl_miembros = ctrl_miembros
     
     def menu(self):
-        print("\n" + "╔" + "═" * 50 + "╗")
-        print("║" + " " * 14 + "GESTIÓN DE ASIGNACIONES" + " " * 13 + "║")
-        print("╚" + "═" * 50 + "╝")
-        print("  [1] Ver todas las asignaciones")
-        print("  [2] Crear nueva asignación")
-        print("  [3] Procesar devolución")
-        print("  [4] Cancelar asignación")
-        print("  [5] Extender fecha de retorno")
-        print("  [6] Guardar cambios")
-        print("  [7] Retornar")
-        print("─" * 52)
+        sys.stdout.write(_MENU)
     
     def listar_todas(self):
-        asigs = self.gestor.obtener_todas()
-        if not asigs:
+        if not self.gestor.ids_usados:
             print("\n⚠ No hay asignaciones registradas")
             return
         
-        print("\n" + "─" * 110)
-        print(f"{'ID':<12}{'Miembro':<28}{'Implemento':<28}{'Cant':<8}{'Retorno':<18}{'Estado'}")
-        print("─" * 110)
+        separador = "─" * 110
+        salida = [
+            "\n" + separador,
+            f"{'ID':<12}{'Miembro':<28}{'Implemento':<28}{'Cant':<8}{'Retorno':<18}{'Estado'}",
+            separador
+        ]
         
-        for a in asigs:
+        for a in self.gestor.iter_todas():
             miembro = self.ctrl_miembros.localizar(a.codigo_miembro)
             impl = self.admin_impl.buscar_por_id(a.codigo_implemento)
             
             nombre_m = miembro.nombre_completo() if miembro else "Desconocido"
             nombre_i = impl.titulo if impl else "Desconocido"
             
-            print(f"{a.identificador:<12}{nombre_m:<28}{nombre_i:<28}"
-                  f"{a.unidades:<8}{a.fecha_retorno:<18}{a.estado}")
-        print("─" * 110)
+            salida.append(_FILA(a.identificador, nombre_m, nombre_i, a.columnas_estado()))
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def proceso_creacion(self):
         print("\n→ NUEVA ASIGNACIÓN")
@@ -120,7 +134,7 @@ class PantallasAsignaciones:
         impl = self.admin_impl.buscar_por_id(asignacion.codigo_implemento)
         if impl:
             impl.ajustar_stock(asignacion.unidades)
-            asignacion.estado = "devuelto"
+            self.gestor.cambiar_estado(asignacion, "devuelto")
             print("  ✓ Devolución procesada correctamente")
             RegistroActividad.registrar_accion(
                 f"Devolución procesada: {id_asig} - {impl.titulo}"
@@ -139,7 +153,7 @@ class PantallasAsignaciones:
         impl = self.admin_impl.buscar_por_id(asignacion.codigo_implemento)
         if impl:
             impl.ajustar_stock(asignacion.unidades)
-            asignacion.estado = "cancelado"
+            self.gestor.cambiar_estado(asignacion, "cancelado")
             print("  ✓ Asignación cancelada")
             RegistroActividad.registrar_accion(f"Asignación cancelada: {id_asig}")
         else:
@@ -163,40 +177,44 @@ class PantallasAsignaciones:
             print("  ✗ La nueva fecha debe ser posterior a la actual")
             return
         
-        asignacion.fecha_retorno = nueva_fecha
+        self.gestor.extender_retorno(asignacion, nueva_fecha)
         print("  ✓ Fecha de retorno extendida")
         RegistroActividad.registrar_accion(
             f"Fecha extendida: {id_asig} - Nueva fecha: {nueva_fecha}"
         )
     
+    def guardar_cambios(self):
+        ok, total = self.gestor.persistir_incremental()
+        self.admin_impl.persistir_cambios()
+        if ok == total:
+            print("\n  ✓ Cambios guardados")
+        else:
+            print("\n  ⚠ Algunos archivos no se guardaron")
+    
     def ejecutar(self):
+        acciones = {
+            '1': self.listar_todas,
+            '2': self.proceso_creacion,
+            '3': self.proceso_devolucion,
+            '4': self.proceso_cancelacion,
+            '5': self.proceso_extension,
+            '6': self.guardar_cambios
+        }
         while True:
             self.menu()
             opcion = input("\n  Opción: ").strip()
             
-            if opcion == '1':
-                self.listar_todas()
-            elif opcion == '2':
-                self.proceso_creacion()
-            elif opcion == '3':
-                self.proceso_devolucion()
-            elif opcion == '4':
-                self.proceso_cancelacion()
-            elif opcion == '5':
-                self.proceso_extension()
-            elif opcion == '6':
-                resultado = self.gestor.persistir()
-                self.admin_impl.persistir_cambios()
-                if all(resultado.values()):
-                    print("\n  ✓ Cambios guardados")
-                else:
-                    print("\n  ⚠ Algunos archivos no se guardaron")
-            elif opcion == '7':
+            if opcion == '7':
                 guardar = input("\n  ¿Guardar antes de salir? (s/n): ").lower().strip()
                 if guardar == 's':
-                    self.gestor.persistir()
+                    self.gestor.persistir_incremental()
                     self.admin_impl.persistir_cambios()
                 print("  → Saliendo...")
                 break
+            
+            accion = acciones.get(opcion)
+            if accion:
+                with Utilidades.fecha_fija():
+                    accion()
             else:
                 print("  ✗ Opción inválida")
\ No newline at end of file
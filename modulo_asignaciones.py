@@ -2,12 +2,19 @@
 Módulo para gestión de asignaciones de implementos
 """
 
-from nucleo_sistema import ElementoSistema, RepositorioBase, RegistroActividad, Utilidades
-from typing import List, Dict, Optional, Set
+from nucleo_sistema import (ElementoSistema, RepositorioBase, RegistroActividad, Utilidades,
+                            FORMATOS_TODOS)
+from collections import Counter, defaultdict
+import csv
+import sys
+from typing import List, Dict, Iterator, Optional, Set, Tuple
 
 
 class Asignacion(ElementoSistema):
-    ESTADOS = ['activo', 'devuelto', 'vencido', 'cancelado']
+    ESTADOS = frozenset({'activo', 'devuelto', 'vencido', 'cancelado'})
+    
+    __slots__ = ('codigo_miembro', 'codigo_implemento', '_unidades',
+                 'fecha_salida', '_fecha_retorno', '_estado', '_columnas')
     
     def __init__(self, identificador: str, codigo_miembro: str, codigo_implemento: str,
                  unidades: int, fecha_salida: str, fecha_retorno: str, estado: str):
@@ -30,6 +37,11 @@ class Asignacion(ElementoSistema):
             "estado": self.estado
         }
     
+    def as_row(self) -> Tuple:
+        """Fila en el orden de CAMPOS"""
+        return (self.identificador, self.codigo_miembro, self.codigo_implemento,
+                self._unidades, self.fecha_salida, self._fecha_retorno, self._estado)
+    
     @classmethod
     def desde_diccionario(cls, datos: Dict):
         return cls(
@@ -42,35 +54,100 @@ class Asignacion(ElementoSistema):
             estado=datos["estado"]
         )
     
+    # Los campos mutables invalidan las columnas preformateadas al cambiar
+    @property
+    def unidades(self) -> int:
+        return self._unidades
+    
+    @unidades.setter
+    def unidades(self, valor: int):
+        self._unidades = valor
+        self._columnas = None
+    
+    @property
+    def fecha_retorno(self) -> str:
+        return self._fecha_retorno
+    
+    @fecha_retorno.setter
+    def fecha_retorno(self, valor: str):
+        self._fecha_retorno = valor
+        self._columnas = None
+    
+    @property
+    def estado(self) -> str:
+        return self._estado
+    
+    @estado.setter
+    def estado(self, valor: str):
+        # Internado: las comparaciones con literales como "activo" se
+        # resuelven por identidad
+        self._estado = sys.intern(valor)
+        self._columnas = None
+    
+    def columnas_estado(self) -> str:
+        """Columnas cantidad/retorno/estado formateadas para listados (en caché)"""
+        if self._columnas is None:
+            self._columnas = f"{self._unidades:<8}{self._fecha_retorno:<18}{self._estado}"
+        return self._columnas
+    
     def esta_vencido(self) -> bool:
+        return self._esta_vencido_con(Utilidades.obtener_fecha_actual())
+    
+    def _esta_vencido_con(self, hoy: str) -> bool:
+        """Igual que esta_vencido pero con la fecha actual ya calculada"""
         if self.estado != "activo":
             return False
-        hoy = Utilidades.obtener_fecha_actual()
         return Utilidades.comparar_fechas(hoy, self.fecha_retorno) > 0
 
 
 class GestorAsignaciones:
+    CAMPOS = ["id", "codigo_miembro", "codigo_implemento", "unidades",
+              "fecha_salida", "fecha_retorno", "estado"]
+    
     def __init__(self, archivo: str = "asignaciones.txt"):
         self.repositorio = RepositorioBase(archivo)
         self.lista: List[Asignacion] = []
-        self.ids_usados: Set[str] = set()
+        self.indice: Dict[str, Asignacion] = {}
+        self._por_miembro: Dict[str, List[Asignacion]] = defaultdict(list)
+        # Conteo de asignaciones por implemento y por miembro, mantenido al cargar y crear
+        self._conteo_implementos: Counter = Counter()
+        self._conteo_miembros: Counter = Counter()
+        # Cambios pendientes de guardar, para persistir_incremental
+        self._nuevas: List[Asignacion] = []
+        self._ids_modificados: Set[str] = set()
         self._cargar()
     
+    @property
+    def ids_usados(self):
+        """IDs registrados (vista sobre el índice)"""
+        return self.indice.keys()
+    
     def _cargar(self):
         self.repositorio.asegurar_archivo_existe()
+        # Alias locales: evitan repetir la búsqueda de atributos en cada fila
+        agregar = self.lista.append
+        indice = self.indice
+        por_miembro = self._por_miembro
+        conteo_implementos = self._conteo_implementos
+        conteo_miembros = self._conteo_miembros
+        Asig = Asignacion
         try:
-            with open(self.repositorio.ruta_txt, "r", encoding="utf-8") as f:
-                for linea in f:
-                    partes = linea.strip().split(",")
+            with open(self.repositorio.ruta_txt, "r", encoding="utf-8",
+                      buffering=1 << 20, newline="") as f:
+                # Sin comillas: las filas se escriben con ','.join
+                for partes in csv.reader(f, quoting=csv.QUOTE_NONE):
                     if len(partes) == 7:
                         try:
-                            asig = Asignacion(
+                            asig = Asig(
                                 partes[0], partes[1], partes[2],
                                 int(partes[3]), partes[4], partes[5], partes[6]
                             )
-                            self.lista.append(asig)
-                            self.ids_usados.add(partes[0])
-                        except:
+                            agregar(asig)
+                            indice[partes[0]] = asig
+                            por_miembro[partes[1]].append(asig)
+                            conteo_miembros[partes[1]] += 1
+                            conteo_implementos[partes[2]] += 1
+                        except (ValueError, IndexError):
                             continue
         except FileNotFoundError:
             print("→ Archivo de asignaciones no encontrado. Se creará al guardar.")
@@ -79,30 +156,71 @@ class GestorAsignaciones:
         if asignacion.identificador in self.ids_usados:
             return False
         self.lista.append(asignacion)
-        self.ids_usados.add(asignacion.identificador)
+        self.indice[asignacion.identificador] = asignacion
+        self._por_miembro[asignacion.codigo_miembro].append(asignacion)
+        self._conteo_miembros[asignacion.codigo_miembro] += 1
+        self._conteo_implementos[asignacion.codigo_implemento] += 1
+        self._nuevas.append(asignacion)
         RegistroActividad.registrar_accion(f"Asignación creada: {asignacion.identificador}")
         return True
     
+    def cambiar_estado(self, asignacion: Asignacion, nuevo_estado: str):
+        """Cambia el estado de una asignación y la marca como modificada"""
+        asignacion.estado = nuevo_estado
+        self._ids_modificados.add(asignacion.identificador)
+    
+    def extender_retorno(self, asignacion: Asignacion, nueva_fecha: str):
+        """Cambia la fecha de retorno y marca la asignación como modificada"""
+        asignacion.fecha_retorno = nueva_fecha
+        self._ids_modificados.add(asignacion.identificador)
+    
     def buscar(self, identificador: str) -> Optional[Asignacion]:
-        for a in self.lista:
-            if a.identificador == identificador:
-                return a
-        return None
+        return self.indice.get(identificador)
     
     def obtener_todas(self) -> List[Asignacion]:
         return self.lista.copy()
     
+    def iter_todas(self) -> Iterator[Asignacion]:
+        """Itera las asignaciones sin copiar la lista (solo lectura)"""
+        return iter(self.lista)
+    
     def obtener_activas(self) -> List[Asignacion]:
         return [a for a in self.lista if a.estado == "activo"]
     
     def obtener_vencidas(self) -> List[Asignacion]:
-        return [a for a in self.lista if a.esta_vencido()]
+        hoy = Utilidades.obtener_fecha_actual()
+        return [a for a in self.lista if a._esta_vencido_con(hoy)]
     
     def obtener_por_miembro(self, codigo_miembro: str) -> List[Asignacion]:
-        return [a for a in self.lista if a.codigo_miembro == codigo_miembro]
+        return list(self._por_miembro.get(codigo_miembro, ()))
+    
+    def ranking_implementos(self, limite: int = 10) -> List[Tuple[str, int]]:
+        """Implementos con más asignaciones; empates en orden de primera aparición"""
+        return self._conteo_implementos.most_common(limite)
+    
+    def ranking_miembros(self, limite: int = 10) -> List[Tuple[str, int]]:
+        """Miembros con más asignaciones; empates en orden de primera aparición"""
+        return self._conteo_miembros.most_common(limite)
     
     def persistir(self):
-        datos = [a.a_diccionario() for a in self.lista]
-        campos = ["id", "codigo_miembro", "codigo_implemento", "unidades", 
-                  "fecha_salida", "fecha_retorno", "estado"]
-        return self.repositorio.persistir_multiformato(datos, campos)
\ No newline at end of file
+        filas = [a.as_row() for a in self.lista]
+        ok, total = self.repositorio.persistir_filas(filas, self.CAMPOS)
+        if ok == total:
+            self._nuevas.clear()
+            self._ids_modificados.clear()
+        return ok, total
+    
+    def persistir_incremental(self):
+        """Guarda solo las asignaciones nuevas; reescribe todo si hubo modificaciones"""
+        if self._ids_modificados or not self.repositorio.archivos_completos():
+            return self.persistir()
+        if not self._nuevas:
+            return FORMATOS_TODOS, FORMATOS_TODOS
+        
+        datos = [a.a_diccionario() for a in self._nuevas]
+        ok, total = self.repositorio.anexar_multiformato(datos, self.CAMPOS)
+        if ok != total:
+            # Un anexo parcial deja los formatos desalineados: reescribir todo
+            return self.persistir()
+        self._nuevas.clear()
+        return ok, total
\ No newline at end of file
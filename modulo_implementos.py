@@ -2,23 +2,54 @@
 Módulo para gestión de implementos del sistema
 """
 
-from nucleo_sistema import ElementoSistema, RepositorioBase, RegistroActividad
-from typing import List, Dict, Optional, Set
+from nucleo_sistema import (ElementoSistema, EnumTexto, RepositorioBase, RegistroActividad,
+                            FORMATOS_TODOS)
+from collections import defaultdict
+from typing import Any, Callable, ClassVar, List, Dict, Iterable, Iterator, KeysView, Optional, Set, Tuple, Union
 from pathlib import Path
+from types import MappingProxyType
+import sys
+
+
+class Condicion(EnumTexto):
+    """Estados posibles de un implemento"""
+    DISPONIBLE = 0
+    PRESTADO = 1
+    DAÑADO = 2
+    MANTENIMIENTO = 3
+
+
+# Opción del menú -> condición (compartido por creación y modificación)
+_CONDICIONES_MENU = MappingProxyType({
+    '1': Condicion.DISPONIBLE,
+    '2': Condicion.PRESTADO,
+    '3': Condicion.DAÑADO,
+    '4': Condicion.MANTENIMIENTO
+})
+
+# Fila del listado completo: ID, nombre, categoría, stock, estado, valor
+_FILA = "{:<12}{:<22}{:<18}{:<10}{:<18}{:>10.2f}".format
 
 
 class Implemento(ElementoSistema):
     """Representa un implemento disponible para préstamo"""
     
-    ESTADOS_VALIDOS = ['disponible', 'prestado', 'dañado', 'mantenimiento']
+    ESTADOS_VALIDOS = frozenset(Condicion)
+    
+    # Aumenta con cada cambio de stock o condición; AdministradorImplementos
+    # lo usa para saber cuándo invalidar sus vistas en caché
+    revision: ClassVar[int] = 0
+    
+    __slots__ = ('titulo', '_tipo', '_tipo_lower', '_stock', '_condicion', 'precio_estimado')
     
     def __init__(self, identificador: str, titulo: str, tipo: str, 
-                 stock: int, condicion: str, precio_estimado: float):
+                 stock: int, condicion: Union[Condicion, str], precio_estimado: float) -> None:
         super().__init__(identificador)
         self.titulo = titulo
         self.tipo = tipo
-        self.stock = stock
-        self.condicion = condicion
+        # Asignación directa: crear un implemento no cambia la revisión
+        self._stock = stock
+        self._condicion = self._convertir_condicion(condicion)
         self.precio_estimado = precio_estimado
     
     def a_diccionario(self) -> Dict:
@@ -27,12 +58,17 @@ class Implemento(ElementoSistema):
             'titulo': self.titulo,
             'tipo': self.tipo,
             'stock': self.stock,
-            'condicion': self.condicion,
+            'condicion': str(self._condicion),
             'precio_estimado': self.precio_estimado
         }
     
+    def as_row(self) -> Tuple:
+        """Fila en el orden de los campos persistidos"""
+        return (self.identificador, self.titulo, self._tipo, self._stock,
+                str(self._condicion), self.precio_estimado)
+    
     @classmethod
-    def desde_diccionario(cls, datos: Dict):
+    def desde_diccionario(cls, datos: Dict) -> 'Implemento':
         return cls(
             identificador=datos['id'],
             titulo=datos['titulo'],
@@ -42,6 +78,41 @@ class Implemento(ElementoSistema):
             precio_estimado=float(datos['precio_estimado'])
         )
     
+    @property
+    def tipo(self) -> str:
+        return self._tipo
+    
+    @tipo.setter
+    def tipo(self, valor: str) -> None:
+        # Se guarda también en minúsculas para los filtros por tipo
+        self._tipo = valor
+        self._tipo_lower = sys.intern(valor.lower())
+    
+    @property
+    def stock(self) -> int:
+        return self._stock
+    
+    @stock.setter
+    def stock(self, valor: int) -> None:
+        self._stock = valor
+        Implemento.revision += 1
+    
+    @staticmethod
+    def _convertir_condicion(valor: Union[Condicion, str]) -> Union[Condicion, str]:
+        # Acepta la enumeración o su texto; un texto desconocido se conserva
+        # tal cual para no perderlo al reescribir el archivo
+        condicion = Condicion.interpretar(valor)
+        return valor if condicion is None else condicion
+    
+    @property
+    def condicion(self) -> Union[Condicion, str]:
+        return self._condicion
+    
+    @condicion.setter
+    def condicion(self, valor: Union[Condicion, str]) -> None:
+        self._condicion = self._convertir_condicion(valor)
+        Implemento.revision += 1
+    
     def ajustar_stock(self, cantidad: int) -> bool:
         """Ajusta el stock del implemento"""
         nuevo_stock = self.stock + cantidad
@@ -52,10 +123,11 @@ class Implemento(ElementoSistema):
     
     def hay_disponibilidad(self, cantidad_solicitada: int) -> bool:
         """Verifica si hay suficiente stock"""
-        return self.stock >= cantidad_solicitada and self.condicion == 'disponible'
+        return self.stock >= cantidad_solicitada and self._condicion is Condicion.DISPONIBLE
     
-    def marcar_condicion(self, nueva_condicion: str):
+    def marcar_condicion(self, nueva_condicion: Union[Condicion, str]) -> None:
         """Cambia el estado del implemento"""
+        nueva_condicion = Condicion.interpretar(nueva_condicion)
         if nueva_condicion in self.ESTADOS_VALIDOS:
             self.condicion = nueva_condicion
 
@@ -63,36 +135,55 @@ class Implemento(ElementoSistema):
 class AdministradorImplementos:
     """Gestiona el inventario de implementos"""
     
-    def __init__(self, nombre_archivo: str = "inventario.txt"):
+    def __init__(self, nombre_archivo: str = "inventario.txt") -> None:
         self.repositorio = RepositorioBase(nombre_archivo)
-        self.coleccion: List[Implemento] = []
-        self.ids_en_uso: Set[str] = set()
+        # Contenedor principal: ID -> implemento, en orden de inserción
+        self._indice: Dict[str, Implemento] = {}
         self.categorias_registradas: Set[str] = set()
+        # Índice secundario: tipo en minúsculas -> implementos de ese tipo
+        self._por_tipo: Dict[str, List[Implemento]] = defaultdict(list)
+        # Resultados de consultas en caché; válidos mientras no cambie
+        # (self._version, Implemento.revision)
+        self._version = 0
+        self._cache: Dict[Tuple, Any] = {}
+        self._cache_estado: Optional[Tuple[int, int]] = None
+        # Cambios pendientes de guardar: implementos nuevos (se anexan) o
+        # modificaciones, que obligan a reescribir los archivos
+        self._nuevos: List[Implemento] = []
+        self._modificado = False
         self._cargar_desde_archivo()
+        self._revision_guardada = Implemento.revision
+    
+    @property
+    def ids_en_uso(self) -> KeysView[str]:
+        """IDs registrados (vista sobre el índice)"""
+        return self._indice.keys()
     
-    def _cargar_desde_archivo(self):
+    def _cargar_desde_archivo(self) -> None:
         """Lee implementos del archivo"""
         self.repositorio.asegurar_archivo_existe()
         
+        indice: Dict[str, Implemento] = self._indice
+        por_tipo: Dict[str, List[Implemento]] = self._por_tipo
+        registrar_categoria: Callable[[str], None] = self.categorias_registradas.add
+        intern: Callable[[str], str] = sys.intern
+        partes: List[str]
+        tipo: str
+        
         try:
-            with open(self.repositorio.ruta_txt, 'r', encoding='utf-8') as f:
-                for linea in f:
-                    partes = linea.strip().split(',')
-                    if len(partes) == 6:
-                        try:
-                            implemento = Implemento(
-                                identificador=partes[0],
-                                titulo=partes[1],
-                                tipo=partes[2],
-                                stock=int(partes[3]),
-                                condicion=partes[4],
-                                precio_estimado=float(partes[5])
-                            )
-                            self.coleccion.append(implemento)
-                            self.ids_en_uso.add(partes[0])
-                            self.categorias_registradas.add(partes[2])
-                        except (ValueError, IndexError):
-                            continue
+            for partes in self.repositorio.leer_filas():
+                if len(partes) != 6:
+                    continue
+                # Pocos tipos distintos: las filas comparten la misma cadena
+                tipo = intern(partes[2])
+                try:
+                    implemento = Implemento(partes[0], partes[1], tipo,
+                                            int(partes[3]), partes[4], float(partes[5]))
+                except ValueError:
+                    continue
+                indice[partes[0]] = implemento
+                por_tipo[implemento._tipo_lower].append(implemento)
+                registrar_categoria(tipo)
         except FileNotFoundError:
             print("→ Archivo de inventario no encontrado. Se creará al guardar.")
     
@@ -104,33 +195,89 @@ class AdministradorImplementos:
             )
             return False
         
-        self.coleccion.append(implemento)
-        self.ids_en_uso.add(implemento.identificador)
+        self._indice[implemento.identificador] = implemento
+        self._por_tipo[implemento._tipo_lower].append(implemento)
         self.categorias_registradas.add(implemento.tipo)
+        self._version += 1
+        self._nuevos.append(implemento)
         
         RegistroActividad.registrar_accion(
             f"Implemento creado: {implemento.titulo} (ID: {implemento.identificador})"
         )
         return True
     
+    def bulk_add(self, rows: Iterable[Dict]) -> int:
+        """Agrega implementos desde diccionarios (mismos campos que a_diccionario) sin pasar por la interfaz.
+        Las filas incompletas o inválidas (texto de otro tipo, condición desconocida, stock o valor
+        negativos) se registran como fallo y se omiten. Retorna cuántos se agregaron"""
+        agregados = 0
+        with RegistroActividad.buffer():
+            for fila in rows:
+                try:
+                    # Mismas reglas que la captura interactiva
+                    for campo in ('id', 'titulo', 'tipo'):
+                        if not isinstance(fila[campo], str):
+                            raise TypeError(f"'{campo}' debe ser texto")
+                    if Condicion.interpretar(fila['condicion']) is None:
+                        raise ValueError(f"condición no válida: {fila['condicion']}")
+                    implemento = Implemento.desde_diccionario(fila)
+                    if implemento.stock < 0 or implemento.precio_estimado < 0:
+                        raise ValueError("el stock y el valor no pueden ser negativos")
+                except (KeyError, TypeError, ValueError) as e:
+                    RegistroActividad.registrar_fallo(f"Fila de lote inválida ({e}): {fila}")
+                    continue
+                if self.agregar_nuevo(implemento):
+                    agregados += 1
+        return agregados
+    
     def buscar_por_id(self, identificador: str) -> Optional[Implemento]:
         """Busca un implemento por su ID"""
-        for item in self.coleccion:
-            if item.identificador == identificador:
-                return item
-        return None
+        return self._indice.get(identificador)
     
     def obtener_todos(self) -> List[Implemento]:
-        """Retorna todos los implementos"""
-        return self.coleccion.copy()
+        """Retorna una copia de los implementos; para solo recorrerlos usar iter_todos"""
+        return list(self._indice.values())
+    
+    def iter_todos(self) -> Iterator[Implemento]:
+        """Itera los implementos sin copiar la colección (solo lectura)"""
+        return iter(self._indice.values())
+    
+    def _memorizado(self, clave: Tuple, calcular: Callable[[], Any]) -> Any:
+        """Retorna el resultado guardado para la clave, recalculándolo si hubo cambios"""
+        estado = (self._version, Implemento.revision)
+        if estado != self._cache_estado:
+            self._cache.clear()
+            self._cache_estado = estado
+        if clave not in self._cache:
+            self._cache[clave] = calcular()
+        return self._cache[clave]
+    
+    def disponibles(self) -> Tuple[Implemento, ...]:
+        """Retorna implementos con stock en condición 'disponible' (en caché)"""
+        return self._memorizado(('disponibles',), lambda: tuple(
+            item for item in self.iter_todos()
+            if item.stock > 0 and item.condicion is Condicion.DISPONIBLE
+        ))
     
     def filtrar_por_tipo(self, tipo: str) -> List[Implemento]:
         """Retorna implementos de un tipo específico"""
-        return [item for item in self.coleccion if item.tipo.lower() == tipo.lower()]
+        return list(self._por_tipo.get(tipo.lower(), ()))
     
     def filtrar_stock_bajo(self, limite: int = 3) -> List[Implemento]:
         """Retorna implementos con stock menor al límite"""
-        return [item for item in self.coleccion if item.stock < limite]
+        return list(self._memorizado(('stock_bajo', limite), lambda: tuple(
+            item for item in self._indice.values() if item.stock < limite
+        )))
+    
+    # Clave de nuevos_datos -> (atributo, conversión); la condición se
+    # convierte en el setter del implemento
+    _CAMPOS_EDITABLES: Dict[str, Tuple[str, Optional[Callable[[Any], Any]]]] = {
+        'titulo': ('titulo', None),
+        'tipo': ('tipo', None),
+        'stock': ('stock', int),
+        'condicion': ('condicion', None),
+        'precio_estimado': ('precio_estimado', float),
+    }
     
     def modificar_existente(self, identificador: str, nuevos_datos: Dict) -> bool:
         """Actualiza los datos de un implemento"""
@@ -138,17 +285,25 @@ class AdministradorImplementos:
         if not implemento:
             return False
         
-        if 'titulo' in nuevos_datos:
-            implemento.titulo = nuevos_datos['titulo']
-        if 'tipo' in nuevos_datos:
-            implemento.tipo = nuevos_datos['tipo']
-            self.categorias_registradas.add(nuevos_datos['tipo'])
-        if 'stock' in nuevos_datos:
-            implemento.stock = int(nuevos_datos['stock'])
-        if 'condicion' in nuevos_datos:
-            implemento.condicion = nuevos_datos['condicion']
-        if 'precio_estimado' in nuevos_datos:
-            implemento.precio_estimado = float(nuevos_datos['precio_estimado'])
+        # Se convierte todo antes de tocar el implemento: si un valor no es
+        # válido el ValueError sale sin dejar el índice por tipo a medias
+        cambios: List[Tuple[str, Any]] = []
+        for clave, valor in nuevos_datos.items():
+            campo = self._CAMPOS_EDITABLES.get(clave)
+            if campo is not None:
+                atributo, convertir = campo
+                cambios.append((atributo, convertir(valor) if convertir else valor))
+        
+        cambia_tipo = 'tipo' in nuevos_datos
+        if cambia_tipo:
+            self._quitar_de_tipo(implemento)
+        for atributo, valor in cambios:
+            setattr(implemento, atributo, valor)
+        if cambia_tipo:
+            self._por_tipo[implemento._tipo_lower].append(implemento)
+            self.categorias_registradas.add(implemento.tipo)
+        self._version += 1
+        self._modificado = True
         
         RegistroActividad.registrar_accion(
             f"Implemento actualizado: {implemento.titulo} (ID: {identificador})"
@@ -161,20 +316,55 @@ class AdministradorImplementos:
         if not implemento:
             return False
         
-        self.coleccion.remove(implemento)
-        self.ids_en_uso.discard(identificador)
+        del self._indice[identificador]
+        self._quitar_de_tipo(implemento)
+        self._version += 1
+        self._modificado = True
         
         RegistroActividad.registrar_accion(
             f"Implemento eliminado: {implemento.titulo} (ID: {identificador})"
         )
         return True
     
-    def persistir_cambios(self):
-        """Guarda todos los cambios en los archivos"""
-        datos = [item.a_diccionario() for item in self.coleccion]
-        campos = ['id', 'titulo', 'tipo', 'stock', 'condicion', 'precio_estimado']
-        resultado = self.repositorio.persistir_multiformato(datos, campos)
-        return resultado
+    def _quitar_de_tipo(self, implemento: Implemento) -> None:
+        """Saca un implemento de su grupo en el índice por tipo"""
+        grupo = self._por_tipo.get(implemento._tipo_lower)
+        if grupo:
+            grupo.remove(implemento)
+            if not grupo:
+                del self._por_tipo[implemento._tipo_lower]
+    
+    CAMPOS = ['id', 'titulo', 'tipo', 'stock', 'condicion', 'precio_estimado']
+    
+    def persistir_cambios(self) -> Tuple[int, int]:
+        """Guarda los cambios pendientes; solo anexa si únicamente se agregaron implementos"""
+        # Los cambios de stock o condición se hacen sobre el implemento y
+        # se detectan por Implemento.revision
+        if (self._modificado or Implemento.revision != self._revision_guardada
+                or not self.repositorio.archivos_completos()):
+            return self._persistir_todo()
+        if not self._nuevos:
+            return FORMATOS_TODOS, FORMATOS_TODOS
+        
+        datos = [item.a_diccionario() for item in self._nuevos]
+        ok, total = self.repositorio.anexar_multiformato(datos, self.CAMPOS)
+        if ok != total:
+            # Un anexo parcial deja los formatos desalineados: reescribir todo
+            return self._persistir_todo()
+        self._nuevos.clear()
+        return ok, total
+    
+    def _persistir_todo(self) -> Tuple[int, int]:
+        """Reescribe los archivos con el inventario completo"""
+        revision = Implemento.revision
+        ok, total = self.repositorio.persistir_filas(
+            [item.as_row() for item in self._indice.values()], self.CAMPOS
+        )
+        if ok == total:
+            self._nuevos.clear()
+            self._modificado = False
+            self._revision_guardada = revision
+        return ok, total
 
 
 class InterfazImplementos:
@@ -200,26 +390,23 @@ class InterfazImplementos:
     
     def mostrar_listado_completo(self):
         """Muestra todos los implementos en tabla"""
-        implementos = self.admin.obtener_todos()
-        
-        if not implementos:
+        if not self.admin.ids_en_uso:
             print("\n⚠ No hay implementos registrados en el sistema")
             return
         
-        print("\n" + "─" * 95)
-        print(f"{'ID':<12}{'Nombre':<22}{'Categoría':<18}{'Stock':<10}{'Estado':<18}{'Valor ($)'}")
-        print("─" * 95)
-        
-        for impl in implementos:
-            print(
-                f"{impl.identificador:<12}"
-                f"{impl.titulo:<22}"
-                f"{impl.tipo:<18}"
-                f"{impl.stock:<10}"
-                f"{impl.condicion:<18}"
-                f"{impl.precio_estimado:>10.2f}"
-            )
-        print("─" * 95)
+        separador = "─" * 95
+        salida = [
+            "\n" + separador,
+            f"{'ID':<12}{'Nombre':<22}{'Categoría':<18}{'Stock':<10}{'Estado':<18}{'Valor ($)'}",
+            separador
+        ]
+        salida.extend(
+            _FILA(impl.identificador, impl.titulo, impl.tipo,
+                  impl.stock, impl.condicion, impl.precio_estimado)
+            for impl in self.admin.iter_todos()
+        )
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def proceso_creacion(self):
         """Proceso interactivo para crear implemento"""
@@ -250,13 +437,7 @@ class InterfazImplementos:
         print("    [4] En mantenimiento")
         
         opcion_estado = input("  Selección: ").strip()
-        estados_map = {
-            '1': 'disponible',
-            '2': 'prestado',
-            '3': 'dañado',
-            '4': 'mantenimiento'
-        }
-        estado = estados_map.get(opcion_estado, 'disponible')
+        estado = _CONDICIONES_MENU.get(opcion_estado, Condicion.DISPONIBLE)
         
         try:
             valor = float(input("  Valor estimado ($): "))
@@ -321,13 +502,7 @@ class InterfazImplementos:
         print("    [4] En mantenimiento")
         opcion_estado = input("  Selección (Enter para mantener): ").strip()
         
-        estados_map = {
-            '1': 'disponible',
-            '2': 'prestado',
-            '3': 'dañado',
-            '4': 'mantenimiento'
-        }
-        nuevo_estado = estados_map.get(opcion_estado)
+        nuevo_estado = _CONDICIONES_MENU.get(opcion_estado)
         
         nuevo_valor_str = input(f"  Nuevo valor [{implemento.precio_estimado}]: ").strip()
         nuevo_valor = None
@@ -383,7 +558,7 @@ class InterfazImplementos:
             print("  ✗ Implemento no encontrado")
             return
         
-        implemento.marcar_condicion('dañado')
+        implemento.marcar_condicion(Condicion.DAÑADO)
         print(f"  ✓ '{implemento.titulo}' marcado como dañado")
         RegistroActividad.registrar_accion(
             f"Implemento marcado como dañado: {implemento.titulo} (ID: {id_impl})"
@@ -408,8 +583,8 @@ class InterfazImplementos:
             elif seleccion == '6':
                 self.proceso_marcar_danado()
             elif seleccion == '7':
-                resultado = self.admin.persistir_cambios()
-                if all(resultado.values()):
+                ok, total = self.admin.persistir_cambios()
+                if ok == total:
                     print("\n  ✓ Cambios guardados en todos los formatos")
                 else:
                     print("\n  ⚠ Algunos archivos no se pudieron guardar")
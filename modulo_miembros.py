@@ -2,17 +2,29 @@
 Módulo para gestión de miembros de la comunidad
 """
 
-from nucleo_sistema import ElementoSistema, RepositorioBase, RegistroActividad
-from typing import List, Dict, Optional, Set
+from nucleo_sistema import ElementoSistema, EnumTexto, RepositorioBase, RegistroActividad
+import sys
+from types import MappingProxyType
+from typing import Any, Callable, List, Dict, Iterator, KeysView, Optional, Tuple, Union
+
+
+class Rol(EnumTexto):
+    """Roles posibles de un miembro"""
+    RESIDENTE = 0
+    ADMINISTRADOR = 1
+
+
+# Opción del menú -> rol; cualquier otra opción se toma como administrador
+_ROLES_MENU = MappingProxyType({'1': Rol.RESIDENTE, '2': Rol.ADMINISTRADOR})
 
 
 class Miembro(ElementoSistema):
     """Representa un miembro de la comunidad"""
     
-    ROLES_VALIDOS = ['residente', 'administrador']
+    __slots__ = ('nombres', 'apellidos', 'telefono', 'ubicacion', '_rol')
     
     def __init__(self, identificador: str, nombres: str, apellidos: str,
-                 telefono: str, ubicacion: str, rol: str):
+                 telefono: str, ubicacion: str, rol: Union[Rol, str]) -> None:
         super().__init__(identificador)
         self.nombres = nombres
         self.apellidos = apellidos
@@ -27,11 +39,16 @@ class Miembro(ElementoSistema):
             'apellidos': self.apellidos,
             'telefono': self.telefono,
             'ubicacion': self.ubicacion,
-            'rol': self.rol
+            'rol': str(self._rol)
         }
     
+    def as_row(self) -> Tuple:
+        """Fila en el orden de los campos persistidos"""
+        return (self.identificador, self.nombres, self.apellidos,
+                self.telefono, self.ubicacion, str(self._rol))
+    
     @classmethod
-    def desde_diccionario(cls, datos: Dict):
+    def desde_diccionario(cls, datos: Dict) -> 'Miembro':
         return cls(
             identificador=datos['id'],
             nombres=datos['nombres'],
@@ -41,46 +58,53 @@ class Miembro(ElementoSistema):
             rol=datos['rol']
         )
     
+    @property
+    def rol(self) -> Union[Rol, str]:
+        return self._rol
+    
+    @rol.setter
+    def rol(self, valor: Union[Rol, str]) -> None:
+        # Acepta la enumeración o su texto; un texto desconocido se conserva
+        # tal cual para no perderlo al reescribir el archivo
+        rol = Rol.interpretar(valor)
+        self._rol = valor if rol is None else rol
+    
     def nombre_completo(self) -> str:
         """Retorna el nombre completo del miembro"""
         return f"{self.nombres} {self.apellidos}"
     
     def es_admin(self) -> bool:
         """Verifica si el miembro es administrador"""
-        return self.rol == 'administrador'
+        return self._rol is Rol.ADMINISTRADOR
 
 
 class ControladorMiembros:
     """Gestiona los miembros de la comunidad"""
     
-    def __init__(self, nombre_archivo: str = "miembros.txt"):
+    def __init__(self, nombre_archivo: str = "miembros.txt") -> None:
         self.repositorio = RepositorioBase(nombre_archivo)
-        self.registro: List[Miembro] = []
-        self.codigos_usados: Set[str] = set()
+        # Contenedor principal: código -> miembro, en orden de inserción
+        self._indice: Dict[str, Miembro] = {}
         self._recuperar_datos()
     
-    def _recuperar_datos(self):
+    @property
+    def codigos_usados(self) -> KeysView[str]:
+        """Códigos registrados (vista sobre el índice)"""
+        return self._indice.keys()
+    
+    def _recuperar_datos(self) -> None:
         """Carga miembros desde el archivo"""
         self.repositorio.asegurar_archivo_existe()
         
+        indice: Dict[str, Miembro] = self._indice
+        campos: List[str]
+        
         try:
-            with open(self.repositorio.ruta_txt, 'r', encoding='utf-8') as f:
-                for linea in f:
-                    campos = linea.strip().split(',')
-                    if len(campos) == 6:
-                        try:
-                            miembro = Miembro(
-                                identificador=campos[0],
-                                nombres=campos[1],
-                                apellidos=campos[2],
-                                telefono=campos[3],
-                                ubicacion=campos[4],
-                                rol=campos[5]
-                            )
-                            self.registro.append(miembro)
-                            self.codigos_usados.add(campos[0])
-                        except (ValueError, IndexError):
-                            continue
+            for campos in self.repositorio.leer_filas():
+                if len(campos) != 6:
+                    continue
+                # Los seis campos son texto: un rol desconocido se conserva
+                indice[campos[0]] = Miembro(*campos)
         except FileNotFoundError:
             print("→ Archivo de miembros no encontrado. Se creará al guardar.")
     
@@ -92,8 +116,7 @@ class ControladorMiembros:
             )
             return False
         
-        self.registro.append(miembro)
-        self.codigos_usados.add(miembro.identificador)
+        self._indice[miembro.identificador] = miembro
         
         RegistroActividad.registrar_accion(
             f"Miembro registrado: {miembro.nombre_completo()} (ID: {miembro.identificador})"
@@ -102,14 +125,24 @@ class ControladorMiembros:
     
     def localizar(self, identificador: str) -> Optional[Miembro]:
         """Busca un miembro por su código"""
-        for persona in self.registro:
-            if persona.identificador == identificador:
-                return persona
-        return None
+        return self._indice.get(identificador)
     
     def listar_todos(self) -> List[Miembro]:
-        """Retorna todos los miembros"""
-        return self.registro.copy()
+        """Retorna una copia de los miembros; para solo recorrerlos usar iter_todos"""
+        return list(self._indice.values())
+    
+    def iter_todos(self) -> Iterator[Miembro]:
+        """Itera los miembros sin copiar la colección (solo lectura)"""
+        return iter(self._indice.values())
+    
+    # Clave de nuevos_datos -> (atributo, conversión que retorna None si no es válido)
+    _CAMPOS_EDITABLES: Dict[str, Tuple[str, Optional[Callable[[Any], Any]]]] = {
+        'nombres': ('nombres', None),
+        'apellidos': ('apellidos', None),
+        'telefono': ('telefono', None),
+        'ubicacion': ('ubicacion', None),
+        'rol': ('rol', Rol.interpretar),
+    }
     
     def actualizar_info(self, identificador: str, nuevos_datos: Dict) -> bool:
         """Actualiza información de un miembro"""
@@ -117,16 +150,17 @@ class ControladorMiembros:
         if not miembro:
             return False
         
-        if 'nombres' in nuevos_datos:
-            miembro.nombres = nuevos_datos['nombres']
-        if 'apellidos' in nuevos_datos:
-            miembro.apellidos = nuevos_datos['apellidos']
-        if 'telefono' in nuevos_datos:
-            miembro.telefono = nuevos_datos['telefono']
-        if 'ubicacion' in nuevos_datos:
-            miembro.ubicacion = nuevos_datos['ubicacion']
-        if 'rol' in nuevos_datos and nuevos_datos['rol'] in Miembro.ROLES_VALIDOS:
-            miembro.rol = nuevos_datos['rol']
+        for clave, valor in nuevos_datos.items():
+            campo = self._CAMPOS_EDITABLES.get(clave)
+            if campo is None:
+                continue
+            atributo, convertir = campo
+            if convertir:
+                valor = convertir(valor)
+                if valor is None:
+                    # Valor no válido (p. ej. rol desconocido): se ignora
+                    continue
+            setattr(miembro, atributo, valor)
         
         RegistroActividad.registrar_accion(
             f"Miembro actualizado: {miembro.nombre_completo()} (ID: {identificador})"
@@ -139,19 +173,19 @@ class ControladorMiembros:
         if not miembro:
             return False
         
-        self.registro.remove(miembro)
-        self.codigos_usados.discard(identificador)
+        del self._indice[identificador]
         
         RegistroActividad.registrar_accion(
             f"Miembro dado de baja: {miembro.nombre_completo()} (ID: {identificador})"
         )
         return True
     
-    def guardar_datos(self):
+    def guardar_datos(self) -> Tuple[int, int]:
         """Persiste los cambios en disco"""
-        datos = [m.a_diccionario() for m in self.registro]
         campos = ['id', 'nombres', 'apellidos', 'telefono', 'ubicacion', 'rol']
-        return self.repositorio.persistir_multiformato(datos, campos)
+        return self.repositorio.persistir_filas(
+            [m.as_row() for m in self._indice.values()], campos
+        )
 
 
 class PantallasMiembros:
@@ -176,26 +210,27 @@ class PantallasMiembros:
     
     def display_listado(self):
         """Muestra todos los miembros"""
-        miembros = self.ctrl.listar_todos()
-        
-        if not miembros:
+        if not self.ctrl.codigos_usados:
             print("\n⚠ No hay miembros registrados")
             return
         
-        print("\n" + "─" * 100)
-        print(f"{'Código':<12}{'Nombres':<20}{'Apellidos':<20}{'Teléfono':<15}{'Dirección':<22}{'Rol'}")
-        print("─" * 100)
-        
-        for m in miembros:
-            print(
-                f"{m.identificador:<12}"
-                f"{m.nombres:<20}"
-                f"{m.apellidos:<20}"
-                f"{m.telefono:<15}"
-                f"{m.ubicacion:<22}"
-                f"{m.rol}"
-            )
-        print("─" * 100)
+        separador = "─" * 100
+        salida = [
+            "\n" + separador,
+            f"{'Código':<12}{'Nombres':<20}{'Apellidos':<20}{'Teléfono':<15}{'Dirección':<22}{'Rol'}",
+            separador
+        ]
+        salida.extend(
+            f"{m.identificador:<12}"
+            f"{m.nombres:<20}"
+            f"{m.apellidos:<20}"
+            f"{m.telefono:<15}"
+            f"{m.ubicacion:<22}"
+            f"{m.rol}"
+            for m in self.ctrl.iter_todos()
+        )
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def flujo_inscripcion(self):
         """Proceso para inscribir nuevo miembro"""
@@ -217,7 +252,7 @@ class PantallasMiembros:
         print("    [2] Administrador")
         
         tipo_opcion = input("  Selección: ").strip()
-        rol = 'residente' if tipo_opcion == '1' else 'administrador'
+        rol = _ROLES_MENU.get(tipo_opcion, Rol.ADMINISTRADOR)
         
         miembro = Miembro(codigo, nombres, apellidos, telefono, direccion, rol)
         
@@ -262,7 +297,7 @@ class PantallasMiembros:
         print("    [1] Residente")
         print("    [2] Administrador")
         tipo_opcion = input("  Selección: ").strip()
-        nuevo_rol = 'residente' if tipo_opcion == '1' else 'administrador'
+        nuevo_rol = _ROLES_MENU.get(tipo_opcion, Rol.ADMINISTRADOR)
         
         datos = {
             'nombres': nuevos_nombres,
@@ -313,8 +348,8 @@ class PantallasMiembros:
             elif opcion == '5':
                 self.flujo_baja()
             elif opcion == '6':
-                resultado = self.ctrl.guardar_datos()
-                if all(resultado.values()):
+                ok, total = self.ctrl.guardar_datos()
+                if ok == total:
                     print("\n  ✓ Datos guardados correctamente")
                 else:
                     print("\n  ⚠ Algunos archivos no se guardaron")
@@ -1,13 +1,48 @@
+import hashlib
 import json
-from datetime import datetime
+import os
+from datetime import date, datetime
+from types import ModuleType
+from typing import Any, Dict, Optional, Tuple
+
+orjson: Optional[ModuleType]
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se usa json
+    orjson = None
+
+
+RUTA_REPORTE = "prestamos_vencidos.md"
+# Huella (blake2b) del último reporte escrito
+RUTA_HUELLA_REPORTE = ".prestamos_vencidos.md.sha"
+
+# Fila de la tabla Markdown; se llena con el diccionario de cada vencido
+_FILA_VENCIDO = "| {id} | {usuario} | {herramienta} | {cantidad} | {fecha_baja} | {motivo}\n".format_map
+
+# archivo -> ((mtime_ns, tamaño), datos): se vuelve a leer solo si el archivo cambió
+_cache: Dict[str, Tuple[Tuple[int, int], Any]] = {}
 
 
 def cargar_datos(archivo):
     try:
-        with open(archivo, "r", encoding="utf-8") as f:
-            return json.load(f)
+        info = os.stat(archivo)
+    except FileNotFoundError:
+        _cache.pop(archivo, None)
+        return []
+
+    firma = (info.st_mtime_ns, info.st_size)
+    guardado = _cache.get(archivo)
+    if guardado is not None and guardado[0] == firma:
+        return guardado[1]
+
+    try:
+        with open(archivo, "rb") as f:
+            contenido = f.read()
     except FileNotFoundError:
         return []
+    datos = orjson.loads(contenido) if orjson is not None else json.loads(contenido)
+    _cache[archivo] = (firma, datos)
+    return datos
 
 
 def obtener_nombre_usuario(id_usuario, usuarios):
@@ -30,7 +65,27 @@ def generar_reporte():
     usuarios = cargar_datos("miembros.json")
     herramientas = cargar_datos("inventario.json")
 
-    hoy = datetime.now().date()
+    # Índices por id: búsqueda directa en lugar de recorrer las listas por cada préstamo
+    usuarios_idx = {u["id"]: u["nombres"] + " " + u["apellidos"] for u in usuarios}
+    herramientas_idx = {h["id"]: h["titulo"] for h in herramientas}
+
+    # Las fechas se comparan como días ordinales (enteros)
+    hoy = datetime.now().date().toordinal()
+
+    # Las fechas se repiten entre préstamos: cada una se convierte una sola vez
+    parse_cache = {}
+
+    def ordinal_fecha(texto):
+        dia = parse_cache.get(texto)
+        if dia is None:
+            if len(texto) == 10 and texto[4] == texto[7] == "-":
+                fecha = date(int(texto[:4]), int(texto[5:7]), int(texto[8:10]))
+            else:
+                # Formas no normalizadas (p. ej. '2024-1-5'): se delega en strptime
+                fecha = datetime.strptime(texto, "%Y-%m-%d").date()
+            dia = fecha.toordinal()
+            parse_cache[texto] = dia
+        return dia
 
     vencidos = []
     total_herramientas = 0
@@ -39,20 +94,16 @@ def generar_reporte():
 
         if p["estado"] == "activo":
 
-            fecha_estimada = datetime.strptime(
-                p["fecha_retorno"], "%Y-%m-%d"
-            ).date()
+            fecha_estimada = ordinal_fecha(p["fecha_retorno"])
 
             if fecha_estimada < hoy:
 
-                dias_atraso = (hoy - fecha_estimada).days
+                dias_atraso = hoy - fecha_estimada
 
-                nombre_usuario = obtener_nombre_usuario(
-                    p["codigo_miembro"], usuarios
-                )
+                nombre_usuario = usuarios_idx.get(p["codigo_miembro"], "Desconocido")
 
-                nombre_herramienta = obtener_nombre_herramienta(
-                    p["codigo_implemento"], herramientas
+                nombre_herramienta = herramientas_idx.get(
+                    p["codigo_implemento"], "Desconocida"
                 )
 
                 vencidos.append({
@@ -61,32 +112,46 @@ def generar_reporte():
                     "herramienta": nombre_herramienta,
                     "cantidad": p["unidades"],
                     "fecha_baja": p["fecha_salida"],
-                   
-                  
+                    "motivo": f"{dias_atraso} días de atraso",
                 })
 
                 total_herramientas += p["unidades"]
 
     # ✅ VALIDAR SI NO HAY VENCIDOS
     if not vencidos:
-        print("| id_prestamo |herramienta | fecha_baja | motivo |\n")
-        f.write("|-------------|------------|------------|--------|\n")
+        print("| id_prestamo |herramienta | fecha_baja | motivo |")
+        print("|-------------|------------|------------|--------|")
         return
 
     # ✅ GENERAR ARCHIVO MARKDOWN
-    with open("prestamos_vencidos.md", "w", encoding="utf-8") as f:
-
-        f.write("# Préstamos Vencidos - Junta Comunal\n\n")
-
-        f.write("| id_prestamo |herramienta | fecha_baja | motivo |\n")
-        f.write("|-------------|------------|------------|--------|\n")
-
-        for v in vencidos:
-            f.write(f"| {v['id']} | {v['usuario']} | {v['herramienta']} | {v['cantidad']} | {v['fecha_baja']} | {v['motivo']}\n")
+    # Encabezado, filas y totales se arman en memoria y se escriben de una vez
+    lineas = [
+        "# Préstamos Vencidos - Junta Comunal\n\n",
+        "| id_prestamo |herramienta | fecha_baja | motivo |\n",
+        "|-------------|------------|------------|--------|\n",
+    ]
+    lineas.extend(map(_FILA_VENCIDO, vencidos))
+    lineas.append("\n")
+    lineas.append(f"**deterioro irreparable:** {len(vencidos)}\n\n")
+    lineas.append(f"**Total de herramientas comprometidas:** {total_herramientas}\n")
+
+    contenido = "".join(lineas).encode("utf-8")
+
+    # Si el reporte no cambió desde la última vez, no se reescribe
+    huella = hashlib.blake2b(contenido).hexdigest()
+    try:
+        with open(RUTA_HUELLA_REPORTE, "r", encoding="utf-8") as f:
+            huella_anterior = f.read().strip()
+    except FileNotFoundError:
+        huella_anterior = None
+    if huella == huella_anterior and os.path.exists(RUTA_REPORTE):
+        print(" Archivo prestamos_vencidos.md sin cambios.")
+        return
 
-        f.write("\n")
-        f.write(f"**deterioro irreparable:** {len(vencidos)}\n\n")
-        f.write(f"**Total de herramientas comprometidas:** {total_herramientas}\n")
+    with open(RUTA_REPORTE, "wb") as f:
+        f.write(contenido)
+    with open(RUTA_HUELLA_REPORTE, "w", encoding="utf-8") as f:
+        f.write(huella + "\n")
 
     print(" Archivo prestamos_vencidos.md generado correctamente.")
 
@@ -5,7 +5,17 @@ Módulo de reportes y consultas del sistema
 from modulo_implementos import AdministradorImplementos
 from modulo_miembros import ControladorMiembros
 from modulo_asignaciones import GestorAsignaciones
-from typing import List, Tuple
+from nucleo_sistema import Utilidades
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+# Plantillas de fila de las pantallas de reportes
+_FILA_STOCK = "  {}: {} unidades".format
+_FILA_VIGENTE = "  ID: {} | {} | {} | Retorno: {}".format
+_FILA_VENCIDA = "  ID: {} | {} | {} | Vencido: {}".format
+_FILA_HISTORIAL = "  {} | {} | {} ud | Estado: {}".format
+_FILA_RANKING = "  {}. {}: {} asignaciones".format
 
 
 class GeneradorReportes:
@@ -34,25 +44,11 @@ class GeneradorReportes:
     
     def implementos_populares(self) -> List[Tuple[str, int]]:
         """Retorna los implementos más solicitados"""
-        contador = {}
-        
-        for asig in self.gestor_asig.obtener_todas():
-            impl_id = asig.codigo_implemento
-            contador[impl_id] = contador.get(impl_id, 0) + 1
-        
-        ranking = sorted(contador.items(), key=lambda x: x[1], reverse=True)
-        return ranking[:10]
+        return self.gestor_asig.ranking_implementos(10)
     
     def miembros_activos(self) -> List[Tuple[str, int]]:
         """Retorna miembros con más asignaciones"""
-        contador = {}
-        
-        for asig in self.gestor_asig.obtener_todas():
-            miembro_id = asig.codigo_miembro
-            contador[miembro_id] = contador.get(miembro_id, 0) + 1
-        
-        ranking = sorted(contador.items(), key=lambda x: x[1], reverse=True)
-        return ranking[:10]
+        return self.gestor_asig.ranking_miembros(10)
 
 
 class InterfazReportes:
@@ -62,6 +58,23 @@ class InterfazReportes:
         self.gen = generador
         self.admin_impl = admin_impl
         self.ctrl_miembros = ctrl_miembros
+        # Código -> nombre para las pantallas; se arman al entrar al menú
+        # (las pantallas de reportes no modifican datos)
+        self._nombres_miembros: Optional[Dict[str, str]] = None
+        self._nombres_impl: Optional[Dict[str, str]] = None
+    
+    def _preparar_nombres(self):
+        """Arma los mapas código -> nombre de miembros e implementos"""
+        self._nombres_miembros = {
+            m.identificador: m.nombre_completo() for m in self.ctrl_miembros.iter_todos()
+        }
+        self._nombres_impl = {i.identificador: i.titulo for i in self.admin_impl.iter_todos()}
+    
+    def _nombres(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Mapas de nombres de la sesión (se arman si aún no existen)"""
+        if self._nombres_miembros is None:
+            self._preparar_nombres()
+        return self._nombres_miembros, self._nombres_impl
     
     def menu(self):
         print("\n" + "╔" + "═" * 45 + "╗")
@@ -82,11 +95,11 @@ class InterfazReportes:
             print("\n✓ No hay implementos con stock crítico")
             return
         
-        print("\n⚠ IMPLEMENTOS CON STOCK BAJO:")
-        print("─" * 60)
-        for item in items:
-            print(f"  {item.titulo}: {item.stock} unidades")
-        print("─" * 60)
+        separador = "─" * 60
+        salida = ["\n⚠ IMPLEMENTOS CON STOCK BAJO:", separador]
+        salida.extend(_FILA_STOCK(item.titulo, item.stock) for item in items)
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def mostrar_vigentes(self):
         asigs = self.gen.asignaciones_vigentes()
@@ -94,15 +107,15 @@ class InterfazReportes:
             print("\n✓ No hay asignaciones vigentes")
             return
         
-        print("\n→ ASIGNACIONES ACTIVAS:")
-        print("─" * 80)
+        separador = "─" * 80
+        salida = ["\n→ ASIGNACIONES ACTIVAS:", separador]
+        miembros, impls = self._nombres()
         for a in asigs:
-            miembro = self.ctrl_miembros.localizar(a.codigo_miembro)
-            impl = self.admin_impl.buscar_por_id(a.codigo_implemento)
-            nombre_m = miembro.nombre_completo() if miembro else "Desconocido"
-            nombre_i = impl.titulo if impl else "Desconocido"
-            print(f"  ID: {a.identificador} | {nombre_m} | {nombre_i} | Retorno: {a.fecha_retorno}")
-        print("─" * 80)
+            nombre_m = miembros.get(a.codigo_miembro, "Desconocido")
+            nombre_i = impls.get(a.codigo_implemento, "Desconocido")
+            salida.append(_FILA_VIGENTE(a.identificador, nombre_m, nombre_i, a.fecha_retorno))
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def mostrar_vencidas(self):
         asigs = self.gen.asignaciones_atrasadas()
@@ -110,15 +123,15 @@ class InterfazReportes:
             print("\n✓ No hay asignaciones vencidas")
             return
         
-        print("\n⚠ ASIGNACIONES VENCIDAS:")
-        print("─" * 80)
+        separador = "─" * 80
+        salida = ["\n⚠ ASIGNACIONES VENCIDAS:", separador]
+        miembros, impls = self._nombres()
         for a in asigs:
-            miembro = self.ctrl_miembros.localizar(a.codigo_miembro)
-            impl = self.admin_impl.buscar_por_id(a.codigo_implemento)
-            nombre_m = miembro.nombre_completo() if miembro else "Desconocido"
-            nombre_i = impl.titulo if impl else "Desconocido"
-            print(f"  ID: {a.identificador} | {nombre_m} | {nombre_i} | Vencido: {a.fecha_retorno}")
-        print("─" * 80)
+            nombre_m = miembros.get(a.codigo_miembro, "Desconocido")
+            nombre_i = impls.get(a.codigo_implemento, "Desconocido")
+            salida.append(_FILA_VENCIDA(a.identificador, nombre_m, nombre_i, a.fecha_retorno))
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def mostrar_historial_miembro(self):
         codigo = input("\n  Código del miembro: ").strip()
@@ -133,13 +146,14 @@ class InterfazReportes:
             print(f"\n  {miembro.nombre_completo()} no tiene historial")
             return
         
-        print(f"\n→ HISTORIAL DE {miembro.nombre_completo().upper()}")
-        print("─" * 80)
+        separador = "─" * 80
+        salida = [f"\n→ HISTORIAL DE {miembro.nombre_completo().upper()}", separador]
+        _, impls = self._nombres()
         for a in asigs:
-            impl = self.admin_impl.buscar_por_id(a.codigo_implemento)
-            nombre_i = impl.titulo if impl else "Desconocido"
-            print(f"  {a.identificador} | {nombre_i} | {a.unidades} ud | Estado: {a.estado}")
-        print("─" * 80)
+            nombre_i = impls.get(a.codigo_implemento, "Desconocido")
+            salida.append(_FILA_HISTORIAL(a.identificador, nombre_i, a.unidades, a.estado))
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def mostrar_implementos_populares(self):
         ranking = self.gen.implementos_populares()
@@ -147,13 +161,14 @@ class InterfazReportes:
             print("\n  No hay datos")
             return
         
-        print("\n→ IMPLEMENTOS MÁS SOLICITADOS:")
-        print("─" * 60)
+        separador = "─" * 60
+        salida = ["\n→ IMPLEMENTOS MÁS SOLICITADOS:", separador]
+        _, impls = self._nombres()
         for i, (impl_id, cantidad) in enumerate(ranking, 1):
-            impl = self.admin_impl.buscar_por_id(impl_id)
-            nombre = impl.titulo if impl else "Desconocido"
-            print(f"  {i}. {nombre}: {cantidad} asignaciones")
-        print("─" * 60)
+            nombre = impls.get(impl_id, "Desconocido")
+            salida.append(_FILA_RANKING(i, nombre, cantidad))
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def mostrar_miembros_activos(self):
         ranking = self.gen.miembros_activos()
@@ -161,32 +176,36 @@ class InterfazReportes:
             print("\n  No hay datos")
             return
         
-        print("\n→ MIEMBROS MÁS ACTIVOS:")
-        print("─" * 60)
+        separador = "─" * 60
+        salida = ["\n→ MIEMBROS MÁS ACTIVOS:", separador]
+        miembros, _ = self._nombres()
         for i, (miembro_id, cantidad) in enumerate(ranking, 1):
-            miembro = self.ctrl_miembros.localizar(miembro_id)
-            nombre = miembro.nombre_completo() if miembro else "Desconocido"
-            print(f"  {i}. {nombre}: {cantidad} asignaciones")
-        print("─" * 60)
+            nombre = miembros.get(miembro_id, "Desconocido")
+            salida.append(_FILA_RANKING(i, nombre, cantidad))
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def ejecutar(self):
+        self._preparar_nombres()
         while True:
             self.menu()
             opcion = input("\n  Opción: ").strip()
             
-            if opcion == '1':
-                self.mostrar_stock_critico()
-            elif opcion == '2':
-                self.mostrar_vigentes()
-            elif opcion == '3':
-                self.mostrar_vencidas()
-            elif opcion == '4':
-                self.mostrar_historial_miembro()
-            elif opcion == '5':
-                self.mostrar_implementos_populares()
-            elif opcion == '6':
-                self.mostrar_miembros_activos()
-            elif opcion == '7':
+            if opcion == '7':
                 break
-            else:
-                print("  ✗ Opción inválida")
\ No newline at end of file
+            
+            with Utilidades.fecha_fija():
+                if opcion == '1':
+                    self.mostrar_stock_critico()
+                elif opcion == '2':
+                    self.mostrar_vigentes()
+                elif opcion == '3':
+                    self.mostrar_vencidas()
+                elif opcion == '4':
+                    self.mostrar_historial_miembro()
+                elif opcion == '5':
+                    self.mostrar_implementos_populares()
+                elif opcion == '6':
+                    self.mostrar_miembros_activos()
+                else:
+                    print("  ✗ Opción inválida")
\ No newline at end of file
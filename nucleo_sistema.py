@@ -3,11 +3,94 @@ Módulo principal del sistema - Contiene las clases base
 Autor: Sistema refactorizado
 """
 
-from datetime import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from enum import IntEnum
+from functools import lru_cache
+from operator import itemgetter
+import hashlib
 import json
 import csv
+import io
+import mmap
+import re
+import textwrap
+import time
 from pathlib import Path
-from typing import List, Dict, Optional, Set
+from types import ModuleType
+from typing import Any, Iterable, Iterator, List, Dict, Optional, Set, Tuple
+
+orjson: Optional[ModuleType]
+try:
+    import orjson
+except ImportError:  # dependencia opcional: se usa json de la biblioteca estándar
+    orjson = None
+
+
+# Bits de formato usados en los resultados de persistencia: (ok, total)
+FORMATO_TXT = 1
+FORMATO_JSON = 2
+FORMATO_CSV = 4
+FORMATOS_TODOS = FORMATO_TXT | FORMATO_JSON | FORMATO_CSV
+
+_PATRON_FECHA = re.compile(r"\A\d{4}-\d{2}-\d{2}\Z")
+
+# Fecha compartida durante una operación (ver Utilidades.fecha_fija)
+_HOY: ContextVar[Optional[str]] = ContextVar("HOY", default=None)
+
+
+def json_a_bytes(obj: Any, indentado: bool = False) -> bytes:
+    """Serializa a JSON en UTF-8 (con orjson si está instalado); indentado usa 2 espacios"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indentado else 0)
+    return json.dumps(obj, indent=2 if indentado else None, ensure_ascii=False).encode('utf-8')
+
+
+def registros_a_filas(datos: Iterable[Dict], campos: List[str]) -> List[Tuple]:
+    """Convierte registros en tuplas ordenadas según campos; un campo ausente queda como ''"""
+    obtener = itemgetter(*campos)
+    unico = len(campos) == 1
+    filas = []
+    for registro in datos:
+        try:
+            valores = obtener(registro)
+        except KeyError:
+            filas.append(tuple(registro.get(c, '') for c in campos))
+            continue
+        # itemgetter con un solo campo retorna el valor, no una tupla
+        filas.append((valores,) if unico else valores)
+    return filas
+
+
+def json_desde_bytes(datos: bytes) -> Any:
+    """Deserializa JSON (con orjson si está instalado)"""
+    return orjson.loads(datos) if orjson is not None else json.loads(datos)
+
+
+class EnumTexto(IntEnum):
+    """Enumeración entera que se muestra y se guarda con su nombre en minúsculas"""
+    
+    @property
+    def texto(self) -> str:
+        return self.name.lower()
+    
+    @classmethod
+    def interpretar(cls, valor):
+        """Acepta un miembro o su texto exacto; retorna None si no es válido"""
+        if isinstance(valor, cls):
+            return valor
+        if not isinstance(valor, str):
+            return None
+        miembro = cls.__members__.get(valor.upper())
+        # Sólo el texto exacto, para no reescribir variantes como 'Dañado'
+        return miembro if miembro is not None and miembro.texto == valor else None
+    
+    def __str__(self) -> str:
+        return self.texto
+    
+    def __format__(self, especificacion: str) -> str:
+        return format(self.texto, especificacion)
 
 
 class Utilidades:
@@ -16,8 +99,10 @@ class Utilidades:
     @staticmethod
     def validar_fecha(texto_fecha: str) -> bool:
         """Verifica si una fecha tiene el formato correcto"""
+        if not _PATRON_FECHA.match(texto_fecha):
+            return False
         try:
-            datetime.strptime(texto_fecha, "%Y-%m-%d")
+            Utilidades.parsear_fecha(texto_fecha)
             return True
         except ValueError:
             return False
@@ -25,13 +110,40 @@ class Utilidades:
     @staticmethod
     def obtener_fecha_actual() -> str:
         """Retorna la fecha actual en formato YYYY-MM-DD"""
+        return _HOY.get() or Utilidades._fecha_del_segundo(int(time.time()))
+    
+    @staticmethod
+    @contextmanager
+    def fecha_fija():
+        """Fija la fecha actual durante el bloque; todas las consultas comparten el mismo valor"""
+        token = _HOY.set(Utilidades._fecha_del_segundo(int(time.time())))
+        try:
+            yield
+        finally:
+            _HOY.reset(token)
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _fecha_del_segundo(segundo: int) -> str:
+        """Calcula la fecha una sola vez por segundo (la clave es el segundo actual)"""
         return datetime.now().strftime("%Y-%m-%d")
     
     @staticmethod
+    @lru_cache(maxsize=4096)
+    def parsear_fecha(texto_fecha: str) -> date:
+        """Convierte 'YYYY-MM-DD' en date; ValueError si no es válida"""
+        if len(texto_fecha) == 10 and texto_fecha[4] == texto_fecha[7] == '-':
+            # Solo la forma canónica: fromisoformat aceptaría también '20240105' o semanas ISO
+            return date.fromisoformat(texto_fecha)
+        # Formas no normalizadas (p. ej. '2024-1-5'): se delega en strptime
+        return datetime.strptime(texto_fecha, "%Y-%m-%d").date()
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
     def comparar_fechas(fecha1: str, fecha2: str) -> int:
         """Compara dos fechas. Retorna: -1 si fecha1 < fecha2, 0 si iguales, 1 si fecha1 > fecha2"""
-        f1 = datetime.strptime(fecha1, "%Y-%m-%d").date()
-        f2 = datetime.strptime(fecha2, "%Y-%m-%d").date()
+        f1 = Utilidades.parsear_fecha(fecha1)
+        f2 = Utilidades.parsear_fecha(fecha2)
         
         if f1 < f2:
             return -1
@@ -47,51 +159,170 @@ class RepositorioBase:
         self.ruta_txt = Path(nombre_archivo)
         self.ruta_json = self.ruta_txt.with_suffix('.json')
         self.ruta_csv = self.ruta_txt.with_suffix('.csv')
+        # Formato -> huella del contenido escrito por última vez en este proceso
+        self._huellas: Dict[int, bytes] = {}
     
     def asegurar_archivo_existe(self):
         """Crea el archivo si no existe"""
         if not self.ruta_txt.exists():
             self.ruta_txt.touch()
     
-    def persistir_multiformato(self, datos: List[Dict], campos: List[str]):
-        """Guarda datos en formatos TXT, JSON y CSV"""
-        resultado = {'txt': False, 'json': False, 'csv': False}
+    def archivos_completos(self) -> bool:
+        """Indica si existen los tres formatos; solo entonces se puede anexar a ellos"""
+        return self.ruta_txt.exists() and self.ruta_json.exists() and self.ruta_csv.exists()
+    
+    def leer_filas(self):
+        """Lee el TXT completo mapeándolo en memoria y lo separa en filas con csv.reader"""
+        with open(self.ruta_txt, 'rb') as f:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                    # Se separa en bytes: str.splitlines también corta en \x1c,
+                    # \x85, \u2028 y otros caracteres válidos dentro de un campo
+                    lineas = mapa[:].splitlines()
+            except ValueError:
+                # Archivo vacío: no se puede mapear un archivo de longitud cero
+                return csv.reader(())
+        # Sin comillas: el TXT se escribe con ','.join, igual que lo leía split(',')
+        return csv.reader((linea.decode('utf-8') for linea in lineas), quoting=csv.QUOTE_NONE)
+    
+    def persistir_multiformato(self, datos: List[Dict], campos: List[str],
+                               formatos: int = FORMATOS_TODOS) -> Tuple[int, int]:
+        """Guarda datos en los formatos pedidos (bits FORMATO_*). Retorna (formatos_ok, formatos)"""
+        return self.persistir_filas(registros_a_filas(datos, campos), campos, formatos)
+    
+    def persistir_filas(self, filas: Iterable[Tuple], campos: List[str],
+                        formatos: int = FORMATOS_TODOS) -> Tuple[int, int]:
+        """Guarda filas (tuplas en el orden de campos) en los formatos pedidos sin armar
+        diccionarios. Un formato cuyo contenido no cambió desde la última escritura no se reescribe"""
+        filas = filas if isinstance(filas, list) else list(filas)
+        # repr distingue 1 de 1.0 y '1' de 1, igual que el texto que se escribiría
+        huella = hashlib.blake2b(repr((campos, filas)).encode('utf-8'), digest_size=16).digest()
+        
+        ok = 0
+        pendientes = 0
+        for formato, ruta in ((FORMATO_TXT, self.ruta_txt), (FORMATO_JSON, self.ruta_json),
+                              (FORMATO_CSV, self.ruta_csv)):
+            if not formatos & formato:
+                continue
+            if self._huellas.get(formato) == huella and ruta.exists():
+                ok |= formato
+            else:
+                pendientes |= formato
         
         # Guardar TXT
+        if pendientes & FORMATO_TXT:
+            try:
+                with open(self.ruta_txt, 'w', encoding='utf-8') as f:
+                    for fila in filas:
+                        f.write(','.join(map(str, fila)) + "\n")
+                ok |= FORMATO_TXT
+            except Exception as e:
+                print(f"[ERROR TXT] {e}")
+        
+        # Guardar JSON: un solo volcado indentado; la lista de diccionarios se arma
+        # completa aquí porque el serializador la recibe de una vez
+        if pendientes & FORMATO_JSON:
+            try:
+                with open(self.ruta_json, 'wb') as f:
+                    f.write(json_a_bytes([dict(zip(campos, fila)) for fila in filas],
+                                         indentado=True))
+                ok |= FORMATO_JSON
+            except Exception as e:
+                print(f"[ERROR JSON] {e}")
+        
+        # Guardar CSV
+        if pendientes & FORMATO_CSV:
+            try:
+                with open(self.ruta_csv, 'w', newline='', encoding='utf-8') as f:
+                    if filas:
+                        escritor = csv.writer(f)
+                        escritor.writerow(campos)
+                        escritor.writerows(filas)
+                ok |= FORMATO_CSV
+            except Exception as e:
+                print(f"[ERROR CSV] {e}")
+        
+        for formato in (FORMATO_TXT, FORMATO_JSON, FORMATO_CSV):
+            if pendientes & formato:
+                if ok & formato:
+                    self._huellas[formato] = huella
+                else:
+                    self._huellas.pop(formato, None)
+        
+        return ok, formatos
+    
+    def anexar_multiformato(self, datos: List[Dict], campos: List[str]) -> Tuple[int, int]:
+        """Agrega registros al final de los archivos TXT, JSON y CSV sin reescribirlos"""
+        # El contenido deja de coincidir con la última escritura completa
+        self._huellas.clear()
+        ok = 0
+        
+        # Anexar TXT
+        filas = registros_a_filas(datos, campos)
         try:
-            with open(self.ruta_txt, 'w', encoding='utf-8') as f:
-                for registro in datos:
-                    linea = ','.join(str(registro.get(c, '')) for c in campos)
-                    f.write(f"{linea}\n")
-            resultado['txt'] = True
+            lineas = [','.join(map(str, fila)) + "\n" for fila in filas]
+            prefijo = ""
+            if self.ruta_txt.exists() and self.ruta_txt.stat().st_size > 0:
+                with open(self.ruta_txt, 'rb') as f:
+                    f.seek(-1, 2)
+                    if f.read(1) != b"\n":
+                        prefijo = "\n"
+            with open(self.ruta_txt, 'a', encoding='utf-8', buffering=1 << 16) as f:
+                f.write(prefijo + "".join(lineas))
+            ok |= FORMATO_TXT
         except Exception as e:
             print(f"[ERROR TXT] {e}")
         
-        # Guardar JSON
+        # Anexar JSON: se reemplaza el corchete de cierre del arreglo existente
         try:
-            with open(self.ruta_json, 'w', encoding='utf-8') as f:
-                json.dump(datos, f, indent=2, ensure_ascii=False)
-            resultado['json'] = True
+            self._anexar_json(datos)
+            ok |= FORMATO_JSON
         except Exception as e:
             print(f"[ERROR JSON] {e}")
         
-        # Guardar CSV
+        # Anexar CSV
         try:
-            with open(self.ruta_csv, 'w', newline='', encoding='utf-8') as f:
-                if datos:
-                    escritor = csv.DictWriter(f, fieldnames=campos)
-                    escritor.writeheader()
-                    escritor.writerows(datos)
-            resultado['csv'] = True
+            nuevo = not self.ruta_csv.exists() or self.ruta_csv.stat().st_size == 0
+            with open(self.ruta_csv, 'a', newline='', encoding='utf-8') as f:
+                escritor = csv.writer(f)
+                if nuevo:
+                    escritor.writerow(campos)
+                escritor.writerows(filas)
+            ok |= FORMATO_CSV
         except Exception as e:
             print(f"[ERROR CSV] {e}")
         
-        return resultado
+        return ok, FORMATOS_TODOS
+    
+    def _anexar_json(self, datos: List[Dict]):
+        """Inserta registros antes del ']' final conservando el formato de json.dump"""
+        bloque = b",\n".join(
+            textwrap.indent(json_a_bytes(registro, indentado=True).decode('utf-8'), "  ").encode('utf-8')
+            for registro in datos
+        )
+        
+        with open(self.ruta_json, 'rb+') as f:
+            tamano = f.seek(0, 2)
+            f.seek(max(0, tamano - 4096))
+            cola = f.read()
+            inicio_cola = tamano - len(cola)
+            
+            cola = cola.rstrip()
+            previo = cola[:-1].rstrip()
+            if not cola.endswith(b"]") or not previo:
+                raise ValueError("el archivo no contiene un arreglo JSON")
+            
+            f.seek(inicio_cola + len(previo))
+            f.truncate()
+            separador = b"\n" if previo.endswith(b"[") else b",\n"
+            f.write(separador + bloque + b"\n]")
 
 
 class ElementoSistema:
     """Clase base para elementos del sistema"""
     
+    __slots__ = ('identificador',)
+    
     def __init__(self, identificador: str):
         self.identificador = identificador
     
@@ -109,51 +340,93 @@ class RegistroActividad:
     """Maneja el registro de eventos del sistema"""
     
     RUTA_LOG_TXT = Path("eventos_sistema.txt")
-    RUTA_LOG_JSON = Path("eventos_sistema.json")
+    # JSON Lines: un objeto por línea, se anexa sin releer el archivo
+    RUTA_LOG_JSON = Path("eventos_sistema.jsonl")
+    # Registro anterior en formato de arreglo JSON; solo se lee
+    RUTA_LOG_JSON_ANTERIOR = Path("eventos_sistema.json")
     RUTA_LOG_CSV = Path("eventos_sistema.csv")
     
+    # Entradas (timestamp, tipo, descripcion) retenidas dentro de buffer();
+    # None cuando se escribe directamente
+    _pendientes: Optional[List[Tuple[str, str, str]]] = None
+    
+    @classmethod
+    @contextmanager
+    def buffer(cls):
+        """Retiene las entradas del bloque y las escribe al salir, abriendo cada archivo una vez"""
+        if cls._pendientes is not None:
+            # Ya hay un buffer activo: el bloque externo hará la escritura
+            yield
+            return
+        cls._pendientes = []
+        try:
+            yield
+        finally:
+            entradas, cls._pendientes = cls._pendientes, None
+            if entradas:
+                cls._volcar(entradas)
+    
     @classmethod
     def escribir_entrada(cls, tipo: str, descripcion: str):
         """Escribe una entrada en el log en múltiples formatos"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        entrada = f"[{timestamp}] [{tipo.upper()}] {descripcion}\n"
-        
+        entrada = (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), tipo.upper(), descripcion)
+        if cls._pendientes is not None:
+            cls._pendientes.append(entrada)
+        else:
+            cls._volcar([entrada])
+    
+    @classmethod
+    def _volcar(cls, entradas: List[Tuple[str, str, str]]):
+        """Escribe las entradas en los tres formatos con una escritura por archivo"""
         # Guardar en TXT
         try:
             with open(cls.RUTA_LOG_TXT, 'a', encoding='utf-8') as f:
-                f.write(entrada)
+                f.write("".join(
+                    f"[{timestamp}] [{tipo}] {descripcion}\n"
+                    for timestamp, tipo, descripcion in entradas
+                ))
         except Exception:
             pass
         
-        # Guardar en JSON
+        # Guardar en JSON Lines
         try:
-            registros = []
-            if cls.RUTA_LOG_JSON.exists():
-                with open(cls.RUTA_LOG_JSON, 'r', encoding='utf-8') as f:
-                    registros = json.load(f)
-            
-            registros.append({
-                'timestamp': timestamp,
-                'tipo': tipo.upper(),
-                'descripcion': descripcion
-            })
-            
-            with open(cls.RUTA_LOG_JSON, 'w', encoding='utf-8') as f:
-                json.dump(registros, f, indent=2, ensure_ascii=False)
+            with open(cls.RUTA_LOG_JSON, 'ab') as f:
+                f.write(b"".join(
+                    json_a_bytes({
+                        'timestamp': timestamp,
+                        'tipo': tipo,
+                        'descripcion': descripcion
+                    }) + b"\n"
+                    for timestamp, tipo, descripcion in entradas
+                ))
         except Exception:
             pass
         
         # Guardar en CSV
         try:
             archivo_existe = cls.RUTA_LOG_CSV.exists()
+            contenido = io.StringIO()
+            escritor = csv.writer(contenido)
+            if not archivo_existe:
+                escritor.writerow(['timestamp', 'tipo', 'descripcion'])
+            escritor.writerows(entradas)
             with open(cls.RUTA_LOG_CSV, 'a', newline='', encoding='utf-8') as f:
-                escritor = csv.writer(f)
-                if not archivo_existe:
-                    escritor.writerow(['timestamp', 'tipo', 'descripcion'])
-                escritor.writerow([timestamp, tipo.upper(), descripcion])
+                f.write(contenido.getvalue())
         except Exception:
             pass
     
+    @classmethod
+    def leer_eventos(cls) -> Iterator[Dict]:
+        """Recorre los eventos registrados, empezando por los del registro anterior"""
+        if cls.RUTA_LOG_JSON_ANTERIOR.exists():
+            with open(cls.RUTA_LOG_JSON_ANTERIOR, 'rb') as f:
+                yield from json_desde_bytes(f.read())
+        if cls.RUTA_LOG_JSON.exists():
+            with open(cls.RUTA_LOG_JSON, 'rb') as f:
+                for linea in f:
+                    if linea.strip():
+                        yield json_desde_bytes(linea)
+    
     @classmethod
     def registrar_accion(cls, mensaje: str):
         """Registra una acción exitosa"""
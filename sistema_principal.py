@@ -4,116 +4,185 @@ Sistema de Gestión Comunitaria de Implementos
 Archivo principal de ejecución
 """
 
-from modulo_implementos import AdministradorImplementos, InterfazImplementos
-from modulo_miembros import ControladorMiembros, PantallasMiembros
-from modulo_asignaciones import GestorAsignaciones
-from interfaz_asignaciones import PantallasAsignaciones
-from modulo_reportes import GeneradorReportes, InterfazReportes
+import argparse
+import json
+import sys
+from functools import cached_property
+from typing import List, Optional
+
+from nucleo_sistema import Utilidades
+
+
+# Menús prerenderados: se construyen una sola vez al importar el módulo
+_MENU_ADMIN = "\n".join([
+    "\n" + "╔" + "═" * 60 + "╗",
+    "║" + " " * 20 + "PANEL DE ADMINISTRACIÓN" + " " * 17 + "║",
+    "╚" + "═" * 60 + "╝",
+    "  [1] Gestión de Implementos",
+    "  [2] Gestión de Miembros",
+    "  [3] Gestión de Prestamos",
+    "  [4] Consultas y Reportes",
+    "  [5] Ver Prestamos vencidos",
+    "  [6] Regresar al menú principal",
+    "─" * 62
+]) + "\n"
+
+_MENU_RESIDENTE = "\n".join([
+    "\n" + "╔" + "═" * 60 + "╗",
+    "║" + " " * 22 + "PANEL DE RESIDENTE" + " " * 20 + "║",
+    "╚" + "═" * 60 + "╝",
+    "  [1] Ver implementos disponibles",
+    "  [2] Ver mis asignaciones",
+    "  [3] Consultar estado de un implemento",
+    "  [4] Ver historial personal",
+    "  [5] Regresar al menú principal",
+    "─" * 62
+]) + "\n"
+
+_MENU_PRINCIPAL = "\n".join([
+    "\n" + "╔" + "═" * 60 + "╗",
+    "║" + " " * 10 + "SISTEMA DE GESTIÓN COMUNITARIA" + " " * 19 + "║",
+    "║" + " " * 17 + "DE IMPLEMENTOS" + " " * 30 + "║",
+    "╚" + "═" * 60 + "╝",
+    "\n" + " " * 20 + "SELECCIONE UNA OPCIÓN",
+    "\n  [1] Panel de Residente",
+    "  [2] Panel de Administración",
+    "  [3] Salir del sistema",
+    "─" * 62
+]) + "\n"
 
 
 class SistemaPrincipal:
     """Controlador principal del sistema"""
     
-    def __init__(self):
-        # Inicializar componentes
-        self.admin_impl = AdministradorImplementos("inventario.txt")
-        self.ctrl_miembros = ControladorMiembros("miembros.txt")
-        self.gestor_asig = GestorAsignaciones("asignaciones.txt")
-        self.gen_reportes = GeneradorReportes(
+    # Los componentes y sus módulos se cargan la primera vez que se usan
+    
+    @cached_property
+    def admin_impl(self):
+        from modulo_implementos import AdministradorImplementos
+        return AdministradorImplementos("inventario.txt")
+    
+    @cached_property
+    def ctrl_miembros(self):
+        from modulo_miembros import ControladorMiembros
+        return ControladorMiembros("miembros.txt")
+    
+    @cached_property
+    def gestor_asig(self):
+        from modulo_asignaciones import GestorAsignaciones
+        return GestorAsignaciones("asignaciones.txt")
+    
+    @cached_property
+    def gen_reportes(self):
+        from modulo_reportes import GeneradorReportes
+        return GeneradorReportes(
             self.admin_impl,
             self.ctrl_miembros,
             self.gestor_asig
         )
     
+    def abrir_implementos(self):
+        """Abre la gestión de implementos"""
+        from modulo_implementos import InterfazImplementos
+        interfaz = InterfazImplementos(self.admin_impl)
+        interfaz.ejecutar()
+    
+    def abrir_miembros(self):
+        """Abre la gestión de miembros"""
+        from modulo_miembros import PantallasMiembros
+        pantallas = PantallasMiembros(self.ctrl_miembros)
+        pantallas.iniciar()
+    
+    def abrir_asignaciones(self):
+        """Abre la gestión de préstamos"""
+        from interfaz_asignaciones import PantallasAsignaciones
+        pantallas = PantallasAsignaciones(
+            self.gestor_asig,
+            self.admin_impl,
+            self.ctrl_miembros
+        )
+        pantallas.ejecutar()
+    
+    def abrir_reportes(self):
+        """Abre consultas y reportes"""
+        from modulo_reportes import InterfazReportes
+        interfaz = InterfazReportes(
+            self.gen_reportes,
+            self.admin_impl,
+            self.ctrl_miembros
+        )
+        interfaz.ejecutar()
+    
     def menu_admin(self):
         """Menú para administradores"""
+        acciones = {
+            '1': self.abrir_implementos,
+            '2': self.abrir_miembros,
+            '3': self.abrir_asignaciones,
+            '4': self.abrir_reportes,
+            '5': self.mostrar_vencidas
+        }
         while True:
-            print("\n" + "╔" + "═" * 60 + "╗")
-            print("║" + " " * 20 + "PANEL DE ADMINISTRACIÓN" + " " * 17 + "║")
-            print("╚" + "═" * 60 + "╝")
-            print("  [1] Gestión de Implementos")
-            print("  [2] Gestión de Miembros")
-            print("  [3] Gestión de Prestamos")
-            print("  [4] Consultas y Reportes")
-            print("  [5] Ver Prestamos vencidos")
-            print("  [6] Regresar al menú principal")
-            print("─" * 62)
+            sys.stdout.write(_MENU_ADMIN)
             
             opcion = input("\n  Selección: ").strip()
             
-            if opcion == '1':
-                interfaz = InterfazImplementos(self.admin_impl)
-                interfaz.ejecutar()
-            elif opcion == '2':
-                pantallas = PantallasMiembros(self.ctrl_miembros)
-                pantallas.iniciar()
-            elif opcion == '3':
-                pantallas = PantallasAsignaciones(
-                    self.gestor_asig,
-                    self.admin_impl,
-                    self.ctrl_miembros
-                )
-                pantallas.ejecutar()
-            elif opcion == '4':
-                interfaz = InterfazReportes(
-                    self.gen_reportes,
-                    self.admin_impl,
-                    self.ctrl_miembros
-                )
-                interfaz.ejecutar()
-            elif opcion == '5':
-                self.mostrar_vencidas()
-            elif opcion == '6':
+            if opcion == '6':
                 print("  → Regresando...")
                 return
+            
+            accion = acciones.get(opcion)
+            if accion:
+                with Utilidades.fecha_fija():
+                    accion()
             else:
                 print("  ✗ Opción inválida")
     
     def menu_residente(self):
         """Menú para residentes"""
+        acciones = {
+            '1': self.ver_implementos_disponibles,
+            '2': self.ver_mis_asignaciones,
+            '3': self.consultar_implemento,
+            '4': self.ver_historial_personal
+        }
         while True:
-            print("\n" + "╔" + "═" * 60 + "╗")
-            print("║" + " " * 22 + "PANEL DE RESIDENTE" + " " * 20 + "║")
-            print("╚" + "═" * 60 + "╝")
-            print("  [1] Ver implementos disponibles")
-            print("  [2] Ver mis asignaciones")
-            print("  [3] Consultar estado de un implemento")
-            print("  [4] Ver historial personal")
-            print("  [5] Regresar al menú principal")
-            print("─" * 62)
+            sys.stdout.write(_MENU_RESIDENTE)
             
             opcion = input("\n  Selección: ").strip()
             
-            if opcion == '1':
-                self.ver_implementos_disponibles()
-            elif opcion == '2':
-                self.ver_mis_asignaciones()
-            elif opcion == '3':
-                self.consultar_implemento()
-            elif opcion == '4':
-                self.ver_historial_personal()
-            elif opcion == '5':
+            if opcion == '5':
                 print("  → Regresando...")
                 return
+            
+            accion = acciones.get(opcion)
+            if accion:
+                with Utilidades.fecha_fija():
+                    accion()
             else:
                 print("  ✗ Opción inválida")
     
     def ver_implementos_disponibles(self):
         """Muestra implementos con stock disponible"""
-        implementos = self.admin_impl.obtener_todos()
-        disponibles = [i for i in implementos if i.stock > 0 and i.condicion == 'disponible']
+        disponibles = self.admin_impl.disponibles()
         
         if not disponibles:
             print("\n⚠ No hay implementos disponibles")
             return
         
-        print("\n→ CATÁLOGO DE IMPLEMENTOS DISPONIBLES")
-        print("─" * 70)
-        print(f"{'ID':<12}{'Nombre':<30}{'Categoría':<18}{'Stock'}")
-        print("─" * 70)
-        for impl in disponibles:
-            print(f"{impl.identificador:<12}{impl.titulo:<30}{impl.tipo:<18}{impl.stock}")
-        print("─" * 70)
+        separador = "─" * 70
+        salida = [
+            "\n→ CATÁLOGO DE IMPLEMENTOS DISPONIBLES",
+            separador,
+            f"{'ID':<12}{'Nombre':<30}{'Categoría':<18}{'Stock'}",
+            separador
+        ]
+        salida.extend(
+            f"{impl.identificador:<12}{impl.titulo:<30}{impl.tipo:<18}{impl.stock}"
+            for impl in disponibles
+        )
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def ver_mis_asignaciones(self):
         """Muestra asignaciones del residente"""
@@ -131,17 +200,21 @@ class SistemaPrincipal:
             print(f"\n  {miembro.nombre_completo()} no tiene asignaciones activas")
             return
         
-        print(f"\n→ ASIGNACIONES DE {miembro.nombre_completo().upper()}")
-        print("─" * 85)
-        print(f"{'ID':<12}{'Implemento':<30}{'Cantidad':<12}{'Retorno':<18}{'Estado'}")
-        print("─" * 85)
+        separador = "─" * 85
+        salida = [
+            f"\n→ ASIGNACIONES DE {miembro.nombre_completo().upper()}",
+            separador,
+            f"{'ID':<12}{'Implemento':<30}{'Cantidad':<12}{'Retorno':<18}{'Estado'}",
+            separador
+        ]
         
         for a in activas:
             impl = self.admin_impl.buscar_por_id(a.codigo_implemento)
             nombre_impl = impl.titulo if impl else "Desconocido"
-            print(f"{a.identificador:<12}{nombre_impl:<30}{a.unidades:<12}"
-                  f"{a.fecha_retorno:<18}{a.estado}")
-        print("─" * 85)
+            salida.append(f"{a.identificador:<12}{nombre_impl:<30}{a.unidades:<12}"
+                          f"{a.fecha_retorno:<18}{a.estado}")
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def consultar_implemento(self):
         """Consulta estado de un implemento"""
@@ -176,14 +249,15 @@ class SistemaPrincipal:
             print(f"\n  {miembro.nombre_completo()} no tiene historial")
             return
         
-        print(f"\n→ HISTORIAL COMPLETO DE {miembro.nombre_completo().upper()}")
-        print("─" * 85)
+        separador = "─" * 85
+        salida = [f"\n→ HISTORIAL COMPLETO DE {miembro.nombre_completo().upper()}", separador]
         
         for a in historial:
             impl = self.admin_impl.buscar_por_id(a.codigo_implemento)
             nombre_impl = impl.titulo if impl else "Desconocido"
-            print(f"  {a.identificador} | {nombre_impl} | {a.estado}")
-        print("─" * 85)
+            salida.append(f"  {a.identificador} | {nombre_impl} | {a.estado}")
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def mostrar_vencidas(self):
         """Muestra asignaciones vencidas"""
@@ -193,8 +267,8 @@ class SistemaPrincipal:
             print("\n✓ No hay asignaciones vencidas")
             return
         
-        print("\n⚠ ASIGNACIONES VENCIDAS")
-        print("─" * 95)
+        separador = "─" * 95
+        salida = ["\n⚠ ASIGNACIONES VENCIDAS", separador]
         
         for a in vencidas:
             miembro = self.ctrl_miembros.localizar(a.codigo_miembro)
@@ -203,50 +277,74 @@ class SistemaPrincipal:
             nombre_m = miembro.nombre_completo() if miembro else "Desconocido"
             nombre_i = impl.titulo if impl else "Desconocido"
             
-            print(f"  {a.identificador} | {nombre_m} | {nombre_i} | Vencido: {a.fecha_retorno}")
-        print("─" * 95)
+            salida.append(f"  {a.identificador} | {nombre_m} | {nombre_i} | Vencido: {a.fecha_retorno}")
+        salida.append(separador)
+        sys.stdout.write("\n".join(salida) + "\n")
     
     def menu_principal(self):
         """Menú de entrada principal"""
+        acciones = {
+            '1': self.menu_residente,
+            '2': self.menu_admin
+        }
         while True:
-            print("\n" + "╔" + "═" * 60 + "╗")
-            print("║" + " " * 10 + "SISTEMA DE GESTIÓN COMUNITARIA" + " " * 19 + "║")
-            print("║" + " " * 17 + "DE IMPLEMENTOS" + " " * 30 + "║")
-            print("╚" + "═" * 60 + "╝")
-            print("\n" + " " * 20 + "SELECCIONE UNA OPCIÓN")
-            print("\n  [1] Panel de Residente")
-            print("  [2] Panel de Administración")
-            print("  [3] Salir del sistema")
-            print("─" * 62)
+            sys.stdout.write(_MENU_PRINCIPAL)
             
             opcion = input("\n  Selección: ").strip()
             
-            if opcion == '1':
-                self.menu_residente()
-            elif opcion == '2':
-                self.menu_admin()
-            elif opcion == '3':
+            if opcion == '3':
                 print("\n" + "─" * 62)
                 print(" " * 18 + "Sistema finalizado")
                 print(" " * 15 + "¡Hasta pronto!")
                 print("─" * 62)
                 break
+            
+            accion = acciones.get(opcion)
+            if accion:
+                accion()
             else:
                 print("  ✗ Opción inválida. Seleccione 1, 2 o 3")
     
     def iniciar(self):
         """Inicia el sistema"""
         # Verificar que haya datos iniciales
-        if not self.ctrl_miembros.listar_todos():
+        if not self.ctrl_miembros.codigos_usados:
             print("\n⚠ ADVERTENCIA: No hay miembros registrados en el sistema")
             print("  El sistema funcionará, pero considere registrar miembros primero\n")
         
         self.menu_principal()
 
 
-def main():
+def cargar_lote(sistema: SistemaPrincipal, ruta: str) -> bool:
+    """Agrega al inventario los implementos de un archivo JSON (lista de objetos) y guarda"""
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            filas = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"  ✗ No se pudo leer el lote {ruta}: {e}")
+        return False
+    if not isinstance(filas, list):
+        print(f"  ✗ El lote {ruta} debe contener una lista de implementos")
+        return False
+    
+    agregados = sistema.admin_impl.bulk_add(filas)
+    ok, total = sistema.admin_impl.persistir_cambios()
+    print(f"  ✓ {agregados} de {len(filas)} implementos agregados desde {ruta}")
+    if ok != total:
+        print("  ⚠ Algunos formatos no pudieron guardarse")
+    return ok == total
+
+
+def main(argv: Optional[List[str]] = None):
     """Punto de entrada del programa"""
+    parser = argparse.ArgumentParser(description="Sistema de Gestión Comunitaria de Implementos")
+    parser.add_argument('--batch', metavar='RUTA_JSON',
+                        help="agrega implementos desde un JSON sin abrir los menús")
+    args = parser.parse_args(argv)
+    
     sistema = SistemaPrincipal()
+    if args.batch:
+        sys.exit(0 if cargar_lote(sistema, args.batch) else 1)
     sistema.iniciar()
 
 